@@ -9,9 +9,14 @@ import unittest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from test.helper import FakeYDL
-from youtube_dl.extractor.common import InfoExtractor
+from youtube_dl.compat import compat_etree_fromstring, compat_str
+from youtube_dl.extractor.common import (
+    InfoExtractor,
+    _base_urljoin,
+    _mpd_template_to_format,
+)
 from youtube_dl.extractor import YoutubeIE, get_info_extractor
-from youtube_dl.utils import encode_data_uri, strip_jsonp, ExtractorError, RegexNotFoundError
+from youtube_dl.utils import encode_data_uri, strip_jsonp, urljoin, ExtractorError, RegexNotFoundError
 
 
 class TestIE(InfoExtractor):
@@ -75,15 +80,158 @@ class TestInfoExtractor(unittest.TestCase):
         self.assertRaises(RegexNotFoundError, ie._html_search_meta, 'z', html, None, fatal=True)
         self.assertRaises(RegexNotFoundError, ie._html_search_meta, ('z', 'x'), html, None, fatal=True)
 
+    def test_hidden_inputs(self):
+        html = '''
+            <input type="hidden" name="a" value="1">
+            <INPUT TYPE="hidden" id="b" value="2"/>
+            <input type="submit" name="c" value="3">
+            <input type="&#104;idden" name="d" value="4">
+            <input type="text" name="e" value="5">
+            <input type="hidden" name="f">
+            <!-- <input type="hidden" name="g" value="7"> -->
+        '''
+        self.assertEqual(
+            InfoExtractor._hidden_inputs(html),
+            {'a': '1', 'b': '2', 'c': '3', 'd': '4'})
+
+    def test_guess_encoding_from_content(self):
+        guess = InfoExtractor._guess_encoding_from_content
+        self.assertEqual(guess('text/html; charset=koi8-r', b''), 'koi8-r')
+        self.assertEqual(guess('text/html;charset=UTF-8', b''), 'UTF-8')
+        self.assertEqual(guess('text/html; charset=cp1251; foo=bar', b''), 'cp1251')
+        self.assertEqual(guess('text/html', b'<meta charset="iso-8859-1">'), 'iso-8859-1')
+        self.assertEqual(guess('text/html; charset=', b'<html>'), 'utf-8')
+        self.assertEqual(guess('text/html; x-user-charset=koi8-r', b'<meta charset="cp1251">'), 'cp1251')
+        self.assertEqual(guess('text/html; name="a;charset=koi8-r"', b'<meta charset="cp1251">'), 'cp1251')
+        self.assertEqual(guess('text/html; name="a"; charset=koi8-r', b'<meta charset="cp1251">'), 'koi8-r')
+        self.assertEqual(guess('', b'\xff\xfe<\x00h\x00'), 'utf-16')
+        self.assertEqual(guess('', b' ' * 1024 + b'<meta charset="cp1251">'), 'utf-8')
+
+    def test_blocked_webpage(self):
+        uri = encode_data_uri(
+            b'<html><title>The URL you requested has been blocked</title>'
+            b'<h1>Error</h1><p>Blocked as per\norder of <b>DoT</b></p></html>', 'text/html')
+        try:
+            self.ie._download_webpage(uri, None)
+        except ExtractorError as e:
+            self.assertTrue('Indian censorship' in compat_str(e))
+            self.assertTrue('(Message: "Blocked as per order of DoT")' in compat_str(e))
+        else:
+            self.fail('Blocked webpage not detected')
+        uri = encode_data_uri(b'<html><title>Not blocked</title></html>', 'text/html')
+        self.assertEqual(self.ie._download_webpage(uri, None), '<html><title>Not blocked</title></html>')
+
+    def test_download_webpage_uses_request_webpage(self):
+        requested = []
+
+        class HookedIE(TestIE):
+            def _request_webpage(self, url_or_request, *args, **kwargs):
+                requested.append(url_or_request)
+                return super(HookedIE, self)._request_webpage(url_or_request, *args, **kwargs)
+
+        uri = encode_data_uri(b'<html></html>', 'text/html')
+        self.assertEqual(HookedIE(FakeYDL())._download_webpage(uri + '#foo', None), '<html></html>')
+        self.assertEqual(requested, [uri])
+
     def test_download_json(self):
         uri = encode_data_uri(b'{"foo": "blah"}', 'application/json')
         self.assertEqual(self.ie._download_json(uri, None), {'foo': 'blah'})
         uri = encode_data_uri(b'callback({"foo": "blah"})', 'application/javascript')
         self.assertEqual(self.ie._download_json(uri, None, transform_source=strip_jsonp), {'foo': 'blah'})
+        uri = encode_data_uri(b'{"id": 18446744073709551617, "neg": -9223372036854775809}', 'application/json')
+        self.assertEqual(
+            self.ie._download_json(uri, None), {'id': 18446744073709551617, 'neg': -9223372036854775809})
         uri = encode_data_uri(b'{"foo": invalid}', 'application/json')
         self.assertRaises(ExtractorError, self.ie._download_json, uri, None)
         self.assertEqual(self.ie._download_json(uri, None, fatal=False), None)
 
+    def test_json_ld(self):
+        self.assertEqual(self.ie._json_ld({
+            '@context': 'http://schema.org',
+            '@type': 'VideoObject',
+            'contentUrl': 'http://example.com/video.mp4',
+            'name': 'Foo &amp; bar',
+            'thumbnailURL': 'http://example.com/thumb.jpg',
+            'duration': 'PT1M30S',
+            'width': '640',
+        }, None), {
+            'url': 'http://example.com/video.mp4',
+            'title': 'Foo & bar',
+            'thumbnail': 'http://example.com/thumb.jpg',
+            'duration': 90,
+            'width': 640,
+        })
+        self.assertEqual(self.ie._json_ld({
+            '@context': 'http://schema.org',
+            '@type': 'TVEpisode',
+            'name': 'Pilot',
+            'episodeNumber': '1',
+            'partOfSeason': {'@type': 'TVSeason', 'seasonNumber': '2'},
+            'partOfSeries': {'@type': 'TVSeries', 'name': 'Series'},
+        }, None), {
+            'episode': 'Pilot',
+            'episode_number': 1,
+            'season_number': 2,
+            'series': 'Series',
+        })
+        self.assertEqual(self.ie._json_ld({
+            '@context': 'http://schema.org',
+            '@type': 'VideoObject',
+            'name': 'Foo',
+        }, None, expected_type='Article'), {})
+
+    def test_base_urljoin(self):
+        paths = [
+            'seg-1.m4s', 'v1/seg-1.m4s?token=a:b', 'v1/seg-1.m4s?', 'a#', 'a;', 'a;p',
+            '../seg.m4s', './seg.m4s', 'a/./b', 'a//b', '/seg.m4s', '?q', '#f', ' seg',
+            'http://example.com/seg.m4s', '//example.com/seg.m4s', 'rtmp:seg', '', None,
+        ]
+        bases = [
+            'http://example.com', 'http://example.com/dash/', 'http://example.com/dash/manifest.mpd?x=/y#z',
+            'http://example.com/a//b/../c', '//example.com/dash/', 'ftp://example.com/', '', None,
+        ]
+        for base in bases:
+            join = _base_urljoin(base)
+            for path in paths:
+                self.assertEqual(join(path), urljoin(base, path))
+
+    def test_mpd_template_to_format(self):
+        def expand(template, representation_id='v1', **kwargs):
+            return _mpd_template_to_format(template, representation_id) % kwargs
+
+        self.assertEqual(
+            expand('$RepresentationID$/$Number$.m4s', Number=3), 'v1/3.m4s')
+        self.assertEqual(
+            expand('seg-$Number%05d$-$Bandwidth$.m4s', Number=3, Bandwidth=1000),
+            'seg-00003-1000.m4s')
+        self.assertEqual(expand('t_$Time$.m4s', Time=90000), 't_90000.m4s')
+        self.assertEqual(
+            expand('%2F$RepresentationID$/a$$b', representation_id='v%1'),
+            '%2Fv%1/a$b')
+
+    def test_parse_mpd_formats_segment_timeline(self):
+        def fragment_urls(segment_timeline):
+            mpd = (
+                '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT10S">'
+                '<Period><AdaptationSet mimeType="video/mp4">'
+                '<SegmentTemplate timescale="1" initialization="init.mp4" media="seg-$Time$-$Number$.m4s">'
+                '<SegmentTimeline>%s</SegmentTimeline></SegmentTemplate>'
+                '<Representation id="v1" bandwidth="1000" codecs="avc1.64001f" width="640" height="360"/>'
+                '</AdaptationSet></Period></MPD>' % segment_timeline)
+            formats = self.ie._parse_mpd_formats(
+                compat_etree_fromstring(mpd.encode('utf-8')), mpd_base_url='http://example.com/')
+            self.assertEqual(len(formats), 1)
+            return [fragment['url'] for fragment in formats[0]['fragments']]
+
+        self.assertEqual(
+            fragment_urls('<S t="0" d="2" r="2"/><S d="3"/>'),
+            ['http://example.com/init.mp4', 'http://example.com/seg-0-1.m4s', 'http://example.com/seg-2-2.m4s',
+             'http://example.com/seg-4-3.m4s', 'http://example.com/seg-6-4.m4s'])
+        self.assertEqual(
+            fragment_urls('<S t="0" d="2" r="1"/><S d="3" r="-1"/>'),
+            ['http://example.com/init.mp4', 'http://example.com/seg-0-1.m4s', 'http://example.com/seg-2-2.m4s',
+             'http://example.com/seg-4-3.m4s'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 import base64
 import datetime
 import hashlib
+import itertools
 import json
 import netrc
 import os
@@ -62,6 +63,181 @@ from ..utils import (
     urljoin,
 )
 
+_META_CHARSET_RE = re.compile(br'<meta[^>]+charset=[\'"]?([^\'")]+)[ /\'">]')
+_BLOCK_MSG_RE = re.compile(r'</h1><p>(.*?)</p>', re.DOTALL)
+_IFRAME_SRC_RE = re.compile(r'<iframe src="([^"]+)"')
+
+# Only used to shorten dump file names, so no cryptographic strength is
+# needed. BLAKE2 is faster than MD5 and keeps working when MD5 is disabled
+# (e.g. FIPS builds); hashlib.blake2b is only available on Python 3.6+
+if hasattr(hashlib, 'blake2b'):
+    def _filename_hash(data):
+        return hashlib.blake2b(data, digest_size=16)
+else:
+    _filename_hash = hashlib.md5
+
+_JSON_LD_RE = re.compile(
+    r'(?s)<script[^>]+type=(["\'])application/ld\+json\1[^>]*>(?P<json_ld>.+?)</script>')
+
+# schema.org item type -> (JSON-LD key, info dict field, transform) tuples
+_JSON_LD_FIELDS = {
+    'TVEpisode': (
+        ('name', 'episode', unescapeHTML),
+        ('episodeNumber', 'episode_number', int_or_none),
+        ('description', 'description', unescapeHTML),
+    ),
+    'Article': (
+        ('datePublished', 'timestamp', parse_iso8601),
+        ('headline', 'title', unescapeHTML),
+        ('articleBody', 'description', unescapeHTML),
+    ),
+    'VideoObject': (
+        ('contentUrl', 'url', None),
+        ('name', 'title', unescapeHTML),
+        ('description', 'description', unescapeHTML),
+        ('duration', 'duration', parse_duration),
+        ('uploadDate', 'timestamp', unified_timestamp),
+        ('contentSize', 'filesize', float_or_none),
+        ('bitrate', 'tbr', int_or_none),
+        ('width', 'width', int_or_none),
+        ('height', 'height', int_or_none),
+    ),
+}
+
+_HTML_COMMENT_RE = re.compile(r'<!--(?:(?!<!--).)*-->')
+_INPUT_TAG_RE = re.compile(r'(?i)(<input[^>]+>)')
+# _form_hidden_inputs patterns, keyed by form id
+_FORM_REGEX_CACHE = {}
+# _xpath_ns results, keyed by (path, namespace)
+_XPATH_NS_CACHE = {}
+
+_RTA_RE = re.compile(r'(?ix)<meta\s+name="rating"\s+'
+                     r'     content="RTA-5042-1996-1400-1577-RTA"')
+_MEDIA_RATING_TABLE = {
+    'safe for kids': 0,
+    'general': 8,
+    '14 years': 14,
+    'mature': 17,
+    'restricted': 19,
+}
+_FAMILY_FRIENDLY_RATING_TABLE = {
+    '1': 0,
+    'true': 0,
+    '0': 18,
+    'false': 18,
+}
+
+# Extension -> rank tables used when sorting formats, higher is better
+_AUDIO_EXT_ORDER = dict((ext, i) for i, ext in enumerate(
+    ['webm', 'opus', 'ogg', 'mp3', 'aac', 'm4a']))
+_FREE_AUDIO_EXT_ORDER = dict((ext, i) for i, ext in enumerate(
+    ['aac', 'mp3', 'm4a', 'webm', 'ogg', 'opus']))
+_VIDEO_EXT_ORDER = dict((ext, i) for i, ext in enumerate(['webm', 'flv', 'mp4']))
+_FREE_VIDEO_EXT_ORDER = dict((ext, i) for i, ext in enumerate(['flv', 'mp4', 'webm']))
+
+_M3U8_RESOLUTION_RE = re.compile(r'(?P<width>\d+)[xX](?P<height>\d+)')
+# Unified Streaming Platform audio/video bitrates in variant URLs
+_USP_BITRATES_RE = re.compile(r'audio.*?(?:%3D|=)(\d+)(?:-video.*?(?:%3D|=)(\d+))?')
+
+# $Identifier$, $Identifier%format$ and $$ in MPD SegmentTemplate@media,
+# and literal % signs that have to be escaped for %-formatting
+_MPD_TEMPLATE_RE = re.compile(
+    r'\$(?:(RepresentationID|Number|Bandwidth|Time)(?:%([^$]+))?)?\$|%')
+
+# Placeholders in ISM StreamIndex@Url
+_ISM_BITRATE_RE = re.compile(r'{[Bb]itrate}')
+_ISM_START_TIME_RE = re.compile(r'{start[ _]time}')
+
+# HTML5 <video>/<audio> elements and their children
+_HTML5_SELF_CLOSING_MEDIA_RE = re.compile(r'(?s)(<(video|audio)[^>]*/>)')
+_HTML5_MEDIA_RE = re.compile(r'(?s)(<(?P<tag>video|audio)[^>]*>)(.*?)</(?P=tag)>')
+_HTML5_SOURCE_RE = re.compile(r'<source[^>]+>')
+_HTML5_TRACK_RE = re.compile(r'<track[^>]+>')
+_HTML5_CONTENT_TYPE_RE = re.compile(r'(?P<mimetype>[^/]+/[^;]+)(?:;\s*codecs="?(?P<codecs>[^"]+))?')
+
+# Akamai and Wowza manifest URL rewriting
+_AKAMAI_I_Z_RE = re.compile(r'(https?://[^/+])/i/')
+_AKAMAI_Z_I_RE = re.compile(r'(https?://[^/]+)/z/')
+_AKAMAI_HOST_RE = re.compile(r'(https?://)[^/]+')
+_WOWZA_MANIFEST_RE = re.compile(r'/(?:manifest|playlist|jwplayer)\.(?:m3u8|f4m|mpd|smil)')
+_WOWZA_BASE_RE = re.compile(r'(?:https?|rtmp|rtsp)(://[^?]+)')
+_WOWZA_SMIL_RE = re.compile(r'(?:/smil:|\.smil)')
+
+_F4M_NS_1_0 = '{http://ns.adobe.com/f4m/1.0}'
+_F4M_NS_2_0 = '{http://ns.adobe.com/f4m/2.0}'
+_F4M_BASE_URL_PATHS = (_F4M_NS_1_0 + 'baseURL', _F4M_NS_2_0 + 'baseURL')
+_F4M_BOOTSTRAP_INFO_PATHS = (_F4M_NS_1_0 + 'bootstrapInfo', _F4M_NS_2_0 + 'bootstrapInfo')
+_F4M_MIME_TYPE_PATHS = (_F4M_NS_1_0 + 'mimeType', _F4M_NS_2_0 + 'mimeType')
+
+# Compiled OpenGraph and <meta> patterns, keyed by property name
+_OG_REGEXES_CACHE = {}
+_META_REGEX_CACHE = {}
+# _og_search_video_url pattern lists, keyed by the secure flag
+_OG_VIDEO_REGEXES_CACHE = {}
+
+
+if sys.version_info[0] >= 3:
+    # The XML parser accepts the already decoded page as is, which saves
+    # encoding it back to UTF-8 and makes the parser ignore an encoding
+    # declaration that no longer applies to the decoded text
+    _xml_from_text = compat_etree_fromstring
+else:
+    def _xml_from_text(xml_string):
+        return compat_etree_fromstring(xml_string.encode('utf-8'))
+
+
+def _xml_tag_namespace(tag, local_name):
+    """
+    Return the namespace of an ElementTree tag in {namespace}local_name form,
+    matching the local name case-insensitively. local_name must be lowercase.
+    """
+    if not tag.startswith('{'):
+        return None
+    namespace, sep, name = tag[1:].partition('}')
+    if not sep or name.lower() != local_name:
+        return None
+    return namespace or None
+
+
+# Relative references that urljoin resolves by appending them to the base
+# URL's directory: no scheme, no leading / . or ?, no characters urlsplit
+# strips or removes and no empty parameters, query or fragment, which
+# urlunparse would drop
+_PLAIN_RELATIVE_URL_RE = re.compile(r'[^\x00-\x20/.?#:;][^\x00-\x20#:;]*(?<!\?)\Z')
+
+
+def _base_urljoin(base):
+    """
+    Return a function equivalent to urljoin(base, path) for a fixed base,
+    which resolves plain relative paths without parsing the base again.
+    """
+    prefix = urljoin(base, '_')
+    if prefix is None:
+        return lambda path: urljoin(base, path)
+    prefix = prefix[:-1]
+
+    def join(path):
+        if (isinstance(path, compat_str) and _PLAIN_RELATIVE_URL_RE.match(path) and
+                '//' not in path and '/.' not in path):
+            return prefix + path
+        return urljoin(base, path)
+    return join
+
+
+def _mpd_template_to_format(template, representation_id):
+    """
+    Convert an MPD SegmentTemplate@media value into a %-format string taking
+    Number, Bandwidth and Time keys, in a single pass over the template.
+    """
+    def replace(mobj):
+        identifier = mobj.group(1)
+        if identifier is None:
+            return '$' if mobj.group(0) == '$$' else '%%'
+        if identifier == 'RepresentationID':
+            return representation_id.replace('%', '%%')
+        return '%%(%s)%s' % (identifier, mobj.group(2) or 'd')
+    return _MPD_TEMPLATE_RE.sub(replace, template)
+
 
 class InfoExtractor(object):
     """Information Extractor class.
@@ -329,15 +505,17 @@ class InfoExtractor(object):
         # This does not use has/getattr intentionally - we want to know whether
         # we have cached the regexp for *this* class, whereas getattr would also
         # match the superclass
-        if '_VALID_URL_RE' not in cls.__dict__:
-            cls._VALID_URL_RE = re.compile(cls._VALID_URL)
-        return cls._VALID_URL_RE.match(url) is not None
+        valid_url_re = cls.__dict__.get('_VALID_URL_RE')
+        if valid_url_re is None:
+            valid_url_re = cls._VALID_URL_RE = re.compile(cls._VALID_URL)
+        return valid_url_re.match(url) is not None
 
     @classmethod
     def _match_id(cls, url):
-        if '_VALID_URL_RE' not in cls.__dict__:
-            cls._VALID_URL_RE = re.compile(cls._VALID_URL)
-        m = cls._VALID_URL_RE.match(url)
+        valid_url_re = cls.__dict__.get('_VALID_URL_RE')
+        if valid_url_re is None:
+            valid_url_re = cls._VALID_URL_RE = re.compile(cls._VALID_URL)
+        m = valid_url_re.match(url)
         assert m
         return m.group('id')
 
@@ -376,24 +554,37 @@ class InfoExtractor(object):
         """Real extraction process. Redefine in subclasses."""
         pass
 
+    @classmethod
+    def _class_ie_key(cls):
+        # Cached per class in _IE_KEY (see suitable for why __dict__ is used)
+        ie_key = cls.__dict__.get('_IE_KEY')
+        if ie_key is None:
+            ie_key = cls._IE_KEY = compat_str(cls.__name__[:-2])
+        return ie_key
+
     @classmethod
     def ie_key(cls):
         """A string for getting the InfoExtractor with get_info_extractor"""
-        return compat_str(cls.__name__[:-2])
+        return cls._class_ie_key()
 
     @property
     def IE_NAME(self):
-        return compat_str(type(self).__name__[:-2])
+        # Not ie_key(), which subclasses may override
+        return self._class_ie_key()
 
     def _request_webpage(self, url_or_request, video_id, note=None, errnote=None, fatal=True, data=None, headers={}, query={}):
         """ Returns the response handle """
-        if note is None:
-            self.report_download_webpage(video_id)
-        elif note is not False:
-            if video_id is None:
-                self.to_screen('%s' % (note,))
-            else:
-                self.to_screen('%s: %s' % (video_id, note))
+        params = self._downloader.params
+        # In quiet mode the note would be discarded by the downloader anyway
+        # (unless a logger is set), so do not bother formatting it
+        if not params.get('quiet', False) or params.get('logger'):
+            if note is None:
+                self.report_download_webpage(video_id)
+            elif note is not False:
+                if video_id is None:
+                    self.to_screen('%s' % (note,))
+                else:
+                    self.to_screen('%s: %s' % (video_id, note))
         if isinstance(url_or_request, compat_urllib_request.Request):
             url_or_request = update_Request(
                 url_or_request, data=data, headers=headers, query=query)
@@ -432,16 +623,27 @@ class InfoExtractor(object):
 
     @staticmethod
     def _guess_encoding_from_content(content_type, webpage_bytes):
-        m = re.match(r'[a-zA-Z0-9_.-]+/[a-zA-Z0-9_.-]+\s*;\s*charset=(.+)', content_type)
-        if m:
-            encoding = m.group(1)
+        # The Content-Type grammar is simple enough not to need a regexp:
+        # take the value of the charset parameter if there is one
+        charset = None
+        for param in content_type.split(';')[1:]:
+            if param.count('"') % 2:
+                # A quoted value containing ';', give up on the parameters
+                break
+            param = param.strip()
+            if param.startswith('charset='):
+                charset = param[len('charset='):].strip()
+                break
+        if charset:
+            encoding = charset
+        elif webpage_bytes.startswith(b'\xff\xfe'):
+            # A UTF-16 <meta> tag would not match the byte regexp anyway
+            encoding = 'utf-16'
         else:
-            m = re.search(br'<meta[^>]+charset=[\'"]?([^\'")]+)[ /\'">]',
-                          webpage_bytes[:1024])
+            # Only look at the first 1024 bytes without slicing the page
+            m = _META_CHARSET_RE.search(webpage_bytes, 0, 1024)
             if m:
                 encoding = m.group(1).decode('ascii')
-            elif webpage_bytes.startswith(b'\xff\xfe'):
-                encoding = 'utf-16'
             else:
                 encoding = 'utf-8'
 
@@ -454,22 +656,36 @@ class InfoExtractor(object):
             webpage_bytes = prefix + webpage_bytes
         if not encoding:
             encoding = self._guess_encoding_from_content(content_type, webpage_bytes)
-        if self._downloader.params.get('dump_intermediate_pages', False):
-            try:
-                url = url_or_request.get_full_url()
-            except AttributeError:
-                url = url_or_request
+        params = self._downloader.params
+        dump_intermediate_pages = params.get('dump_intermediate_pages', False)
+        write_pages = params.get('write_pages', False)
+        if dump_intermediate_pages or write_pages:
+            self._dump_webpage(
+                url_or_request, video_id, webpage_bytes,
+                dump_intermediate_pages, write_pages)
+
+        try:
+            content = webpage_bytes.decode(encoding, 'replace')
+        except LookupError:
+            content = webpage_bytes.decode('utf-8', 'replace')
+
+        self._check_blocked(content)
+
+        return content
+
+    def _dump_webpage(self, url_or_request, video_id, webpage_bytes, dump_intermediate_pages, write_pages):
+        try:
+            url = url_or_request.get_full_url()
+        except AttributeError:
+            url = url_or_request
+        if dump_intermediate_pages:
             self.to_screen('Dumping request to ' + url)
             dump = base64.b64encode(webpage_bytes).decode('ascii')
             self._downloader.to_screen(dump)
-        if self._downloader.params.get('write_pages', False):
-            try:
-                url = url_or_request.get_full_url()
-            except AttributeError:
-                url = url_or_request
+        if write_pages:
             basen = '%s_%s' % (video_id, url)
             if len(basen) > 240:
-                h = '___' + hashlib.md5(basen.encode('utf-8')).hexdigest()
+                h = '___' + _filename_hash(basen.encode('utf-8')).hexdigest()
                 basen = basen[:240 - len(h)] + h
             raw_filename = basen + '.dump'
             filename = sanitize_filename(raw_filename, restricted=True)
@@ -483,35 +699,37 @@ class InfoExtractor(object):
             with open(filename, 'wb') as outf:
                 outf.write(webpage_bytes)
 
-        try:
-            content = webpage_bytes.decode(encoding, 'replace')
-        except LookupError:
-            content = webpage_bytes.decode('utf-8', 'replace')
-
+    def _check_blocked(self, content):
+        # Both known block pages have a title ending with "blocked", so a
+        # single substring scan rules them out for regular pages
+        if 'blocked</title>' not in content:
+            return
+        # Search the first 512 characters in place rather than slicing them
         if ('<title>Access to this site is blocked</title>' in content and
-                'Websense' in content[:512]):
+                content.find('Websense', 0, 512) != -1):
             msg = 'Access to this webpage has been blocked by Websense filtering software in your network.'
             blocked_iframe = self._html_search_regex(
-                r'<iframe src="([^"]+)"', content,
+                _IFRAME_SRC_RE, content,
                 'Websense information URL', default=None)
             if blocked_iframe:
                 msg += ' Visit %s for more details' % blocked_iframe
             raise ExtractorError(msg, expected=True)
-        if '<title>The URL you requested has been blocked</title>' in content[:512]:
+        if content.find('<title>The URL you requested has been blocked</title>', 0, 512) != -1:
             msg = (
                 'Access to this webpage has been blocked by Indian censorship. '
                 'Use a VPN or proxy server (with --proxy) to route around it.')
             block_msg = self._html_search_regex(
-                r'</h1><p>(.*?)</p>',
-                content, 'block message', default=None)
+                _BLOCK_MSG_RE, content, 'block message', default=None)
             if block_msg:
                 msg += ' (Message: "%s")' % block_msg.replace('\n', ' ')
             raise ExtractorError(msg, expected=True)
 
-        return content
-
     def _download_webpage(self, url_or_request, video_id, note=None, errnote=None, fatal=True, tries=1, timeout=5, encoding=None, data=None, headers={}, query={}):
         """ Returns the data of the page as a string """
+        if tries == 1:
+            # Nothing to retry, so skip the retry loop altogether
+            res = self._download_webpage_handle(url_or_request, video_id, note, errnote, fatal, encoding=encoding, data=data, headers=headers, query=query)
+            return res if res is False else res[0]
         success = False
         try_count = 0
         while success is False:
@@ -539,7 +757,7 @@ class InfoExtractor(object):
             return xml_string
         if transform_source:
             xml_string = transform_source(xml_string)
-        return compat_etree_fromstring(xml_string.encode('utf-8'))
+        return _xml_from_text(xml_string)
 
     def _download_json(self, url_or_request, video_id,
                        note='Downloading JSON metadata',
@@ -637,28 +855,40 @@ class InfoExtractor(object):
         In case of failure return a default value or raise a WARNING or a
         RegexNotFoundError, depending on fatal, specifying the field name.
         """
-        if isinstance(pattern, (str, compat_str, compiled_regex_type)):
+        if isinstance(pattern, compiled_regex_type):
+            mobj = pattern.search(string)
+        elif isinstance(pattern, (str, compat_str)):
             mobj = re.search(pattern, string, flags)
         else:
+            mobj = None
             for p in pattern:
-                mobj = re.search(p, string, flags)
+                if isinstance(p, compiled_regex_type):
+                    # flags are already part of a compiled pattern
+                    mobj = p.search(string)
+                else:
+                    mobj = re.search(p, string, flags)
                 if mobj:
                     break
 
-        if not self._downloader.params.get('no_color') and compat_os_name != 'nt' and sys.stderr.isatty():
-            _name = '\033[0;34m%s\033[0m' % name
-        else:
-            _name = name
-
         if mobj:
             if group is None:
                 # return the first matching group
+                if mobj.lastindex == 1:
+                    # Group 1 closed last, hence it matched and is the first one
+                    return mobj.group(1)
                 return next(g for g in mobj.groups() if g is not None)
             else:
                 return mobj.group(group)
         elif default is not NO_DEFAULT:
             return default
-        elif fatal:
+
+        # Only colorize the field name when it is actually going to be reported
+        if not self._downloader.params.get('no_color') and compat_os_name != 'nt' and sys.stderr.isatty():
+            _name = '\033[0;34m%s\033[0m' % name
+        else:
+            _name = name
+
+        if fatal:
             raise RegexNotFoundError('Unable to extract %s' % _name)
         else:
             self._downloader.report_warning('unable to extract %s' % _name + bug_reports_message())
@@ -745,21 +975,41 @@ class InfoExtractor(object):
             template % (content_re, property_re),
         ]
 
+    @staticmethod
+    def _og_compiled_regexes(prop):
+        regexes = _OG_REGEXES_CACHE.get(prop)
+        if regexes is None:
+            regexes = _OG_REGEXES_CACHE[prop] = [
+                re.compile(r, re.DOTALL) for r in InfoExtractor._og_regexes(prop)]
+        return regexes
+
     @staticmethod
     def _meta_regex(prop):
         return r'''(?isx)<meta
                     (?=[^>]+(?:itemprop|name|property|id|http-equiv)=(["\']?)%s\1)
                     [^>]+?content=(["\'])(?P<content>.*?)\2''' % re.escape(prop)
 
+    @staticmethod
+    def _meta_compiled_regex(prop):
+        regex = _META_REGEX_CACHE.get(prop)
+        if regex is None:
+            regex = _META_REGEX_CACHE[prop] = re.compile(
+                InfoExtractor._meta_regex(prop))
+        return regex
+
     def _og_search_property(self, prop, html, name=None, **kargs):
         if not isinstance(prop, (list, tuple)):
             prop = [prop]
         if name is None:
             name = 'OpenGraph %s' % prop[0]
         og_regexes = []
-        for p in prop:
-            og_regexes.extend(self._og_regexes(p))
-        escaped = self._search_regex(og_regexes, html, name, flags=re.DOTALL, **kargs)
+        # OpenGraph patterns match og: case-sensitively, so without it in
+        # the page there is nothing to search for; _search_regex still
+        # handles default and fatal for the empty pattern list
+        if 'og:' in html:
+            for p in prop:
+                og_regexes.extend(self._og_compiled_regexes(p))
+        escaped = self._search_regex(og_regexes, html, name, **kargs)
         if escaped is None:
             return None
         return unescapeHTML(escaped)
@@ -774,9 +1024,15 @@ class InfoExtractor(object):
         return self._og_search_property('title', html, **kargs)
 
     def _og_search_video_url(self, html, name='video url', secure=True, **kargs):
-        regexes = self._og_regexes('video') + self._og_regexes('video:url')
-        if secure:
-            regexes = self._og_regexes('video:secure_url') + regexes
+        secure = bool(secure)
+        regexes = _OG_VIDEO_REGEXES_CACHE.get(secure)
+        if regexes is None:
+            regexes = self._og_compiled_regexes('video') + self._og_compiled_regexes('video:url')
+            if secure:
+                regexes = self._og_compiled_regexes('video:secure_url') + regexes
+            _OG_VIDEO_REGEXES_CACHE[secure] = regexes
+        if 'og:' not in html:
+            regexes = []
         return self._html_search_regex(regexes, html, name, **kargs)
 
     def _og_search_url(self, html, **kargs):
@@ -788,7 +1044,7 @@ class InfoExtractor(object):
         if display_name is None:
             display_name = name[0]
         return self._html_search_regex(
-            [self._meta_regex(n) for n in name],
+            [self._meta_compiled_regex(n) for n in name],
             html, display_name, fatal=fatal, group='content', **kwargs)
 
     def _dc_search_uploader(self, html):
@@ -796,9 +1052,7 @@ class InfoExtractor(object):
 
     def _rta_search(self, html):
         # See http://www.rtalabel.org/index.php?content=howtofaq#single
-        if re.search(r'(?ix)<meta\s+name="rating"\s+'
-                     r'     content="RTA-5042-1996-1400-1577-RTA"',
-                     html):
+        if _RTA_RE.search(html):
             return 18
         return 0
 
@@ -809,14 +1063,7 @@ class InfoExtractor(object):
         if not rating:
             return None
 
-        RATING_TABLE = {
-            'safe for kids': 0,
-            'general': 8,
-            '14 years': 14,
-            'mature': 17,
-            'restricted': 19,
-        }
-        return RATING_TABLE.get(rating.lower())
+        return _MEDIA_RATING_TABLE.get(rating.lower())
 
     def _family_friendly_search(self, html):
         # See http://schema.org/VideoObject
@@ -825,13 +1072,7 @@ class InfoExtractor(object):
         if not family_friendly:
             return None
 
-        RATING_TABLE = {
-            '1': 0,
-            'true': 0,
-            '0': 18,
-            'false': 18,
-        }
-        return RATING_TABLE.get(family_friendly.lower())
+        return _FAMILY_FRIENDLY_RATING_TABLE.get(family_friendly.lower())
 
     def _twitter_search_player(self, html):
         return self._html_search_meta('twitter:player', html,
@@ -839,8 +1080,7 @@ class InfoExtractor(object):
 
     def _search_json_ld(self, html, video_id, expected_type=None, **kwargs):
         json_ld = self._search_regex(
-            r'(?s)<script[^>]+type=(["\'])application/ld\+json\1[^>]*>(?P<json_ld>.+?)</script>',
-            html, 'JSON-LD', group='json_ld', **kwargs)
+            _JSON_LD_RE, html, 'JSON-LD', group='json_ld', **kwargs)
         default = kwargs.get('default', NO_DEFAULT)
         if not json_ld:
             return default if default is not NO_DEFAULT else {}
@@ -865,45 +1105,31 @@ class InfoExtractor(object):
                 item_type = e.get('@type')
                 if expected_type is not None and expected_type != item_type:
                     return info
+                for src, dst, transform in _JSON_LD_FIELDS.get(item_type, ()):
+                    v = e.get(src)
+                    info[dst] = transform(v) if transform else v
                 if item_type == 'TVEpisode':
-                    info.update({
-                        'episode': unescapeHTML(e.get('name')),
-                        'episode_number': int_or_none(e.get('episodeNumber')),
-                        'description': unescapeHTML(e.get('description')),
-                    })
                     part_of_season = e.get('partOfSeason')
                     if isinstance(part_of_season, dict) and part_of_season.get('@type') == 'TVSeason':
                         info['season_number'] = int_or_none(part_of_season.get('seasonNumber'))
                     part_of_series = e.get('partOfSeries') or e.get('partOfTVSeries')
                     if isinstance(part_of_series, dict) and part_of_series.get('@type') == 'TVSeries':
                         info['series'] = unescapeHTML(part_of_series.get('name'))
-                elif item_type == 'Article':
-                    info.update({
-                        'timestamp': parse_iso8601(e.get('datePublished')),
-                        'title': unescapeHTML(e.get('headline')),
-                        'description': unescapeHTML(e.get('articleBody')),
-                    })
                 elif item_type == 'VideoObject':
-                    info.update({
-                        'url': e.get('contentUrl'),
-                        'title': unescapeHTML(e.get('name')),
-                        'description': unescapeHTML(e.get('description')),
-                        'thumbnail': e.get('thumbnailUrl') or e.get('thumbnailURL'),
-                        'duration': parse_duration(e.get('duration')),
-                        'timestamp': unified_timestamp(e.get('uploadDate')),
-                        'filesize': float_or_none(e.get('contentSize')),
-                        'tbr': int_or_none(e.get('bitrate')),
-                        'width': int_or_none(e.get('width')),
-                        'height': int_or_none(e.get('height')),
-                    })
+                    info['thumbnail'] = e.get('thumbnailUrl') or e.get('thumbnailURL')
                 break
         return dict((k, v) for k, v in info.items() if v is not None)
 
     @staticmethod
     def _hidden_inputs(html):
-        html = re.sub(r'<!--(?:(?!<!--).)*-->', '', html)
+        html = _HTML_COMMENT_RE.sub('', html)
         hidden_inputs = {}
-        for input in re.findall(r'(?i)(<input[^>]+>)', html):
+        for input in _INPUT_TAG_RE.findall(html):
+            # Skip inputs that cannot be of hidden or submit type without
+            # running the HTML parser on them; entities could spell out
+            # the type, so only tags without any are skipped
+            if 'hidden' not in input and 'submit' not in input and '&' not in input:
+                continue
             attrs = extract_attributes(input)
             if not input:
                 continue
@@ -916,9 +1142,12 @@ class InfoExtractor(object):
         return hidden_inputs
 
     def _form_hidden_inputs(self, form_id, html):
-        form = self._search_regex(
-            r'(?is)<form[^>]+?id=(["\'])%s\1[^>]*>(?P<form>.+?)</form>' % form_id,
-            html, '%s form' % form_id, group='form')
+        form_re = _FORM_REGEX_CACHE.get(form_id)
+        if form_re is None:
+            # form_id is interpolated as is, so callers may pass a pattern
+            form_re = _FORM_REGEX_CACHE[form_id] = re.compile(
+                r'(?is)<form[^>]+?id=(["\'])%s\1[^>]*>(?P<form>.+?)</form>' % form_id)
+        form = self._search_regex(form_re, html, '%s form' % form_id, group='form')
         return self._hidden_inputs(form)
 
     def _sort_formats(self, formats, field_preference=None):
@@ -930,13 +1159,19 @@ class InfoExtractor(object):
             # formats sorting in some cases)
             if 'tbr' not in f and f.get('abr') is not None and f.get('vbr') is not None:
                 f['tbr'] = f['abr'] + f['vbr']
-
-        def _formats_key(f):
             # TODO remove the following workaround
-            from ..utils import determine_ext
             if not f.get('ext') and 'url' in f:
                 f['ext'] = determine_ext(f['url'])
 
+        # Pick the extension preference tables once rather than for every format
+        if self._downloader.params.get('prefer_free_formats'):
+            audio_ext_order = _FREE_AUDIO_EXT_ORDER
+            video_ext_order = _FREE_VIDEO_EXT_ORDER
+        else:
+            audio_ext_order = _AUDIO_EXT_ORDER
+            video_ext_order = _VIDEO_EXT_ORDER
+
+        def _formats_key(f):
             if isinstance(field_preference, (list, tuple)):
                 return tuple(
                     f.get(field)
@@ -955,26 +1190,12 @@ class InfoExtractor(object):
 
             if f.get('vcodec') == 'none':  # audio only
                 preference -= 50
-                if self._downloader.params.get('prefer_free_formats'):
-                    ORDER = ['aac', 'mp3', 'm4a', 'webm', 'ogg', 'opus']
-                else:
-                    ORDER = ['webm', 'opus', 'ogg', 'mp3', 'aac', 'm4a']
                 ext_preference = 0
-                try:
-                    audio_ext_preference = ORDER.index(f['ext'])
-                except ValueError:
-                    audio_ext_preference = -1
+                audio_ext_preference = audio_ext_order.get(f['ext'], -1)
             else:
                 if f.get('acodec') == 'none':  # video only
                     preference -= 40
-                if self._downloader.params.get('prefer_free_formats'):
-                    ORDER = ['flv', 'mp4', 'webm']
-                else:
-                    ORDER = ['webm', 'flv', 'mp4']
-                try:
-                    ext_preference = ORDER.index(f['ext'])
-                except ValueError:
-                    ext_preference = -1
+                ext_preference = video_ext_order.get(f['ext'], -1)
                 audio_ext_preference = 0
 
             return (
@@ -999,11 +1220,11 @@ class InfoExtractor(object):
 
     def _check_formats(self, formats, video_id):
         if formats:
-            formats[:] = filter(
-                lambda f: self._is_valid_url(
+            formats[:] = [
+                f for f in formats
+                if self._is_valid_url(
                     f['url'], video_id,
-                    item='%s video format' % f.get('format_id') if f.get('format_id') else 'video'),
-                formats)
+                    item='%s video format' % f.get('format_id') if f.get('format_id') else 'video')]
 
     @staticmethod
     def _remove_duplicate_formats(formats):
@@ -1076,7 +1297,7 @@ class InfoExtractor(object):
                            transform_source=lambda s: fix_xml_ampersands(s).strip(),
                            fatal=True, m3u8_id=None):
         # currently youtube-dl cannot decode the playerVerificationChallenge as Akamai uses Adobe Alchemy
-        akamai_pv = manifest.find('{http://ns.adobe.com/f4m/1.0}pv-2.0')
+        akamai_pv = manifest.find(_F4M_NS_1_0 + 'pv-2.0')
         if akamai_pv is not None and ';' in akamai_pv.text:
             playerVerificationChallenge = akamai_pv.text.split(';')[0]
             if playerVerificationChallenge.strip() != '':
@@ -1084,37 +1305,41 @@ class InfoExtractor(object):
 
         formats = []
         manifest_version = '1.0'
-        media_nodes = manifest.findall('{http://ns.adobe.com/f4m/1.0}media')
+        media_nodes = manifest.findall(_F4M_NS_1_0 + 'media')
         if not media_nodes:
             manifest_version = '2.0'
-            media_nodes = manifest.findall('{http://ns.adobe.com/f4m/2.0}media')
+            media_nodes = manifest.findall(_F4M_NS_2_0 + 'media')
         # Remove unsupported DRM protected media from final formats
         # rendition (see https://github.com/rg3/youtube-dl/issues/8573).
         media_nodes = remove_encrypted_media(media_nodes)
         if not media_nodes:
             return formats
         base_url = xpath_text(
-            manifest, ['{http://ns.adobe.com/f4m/1.0}baseURL', '{http://ns.adobe.com/f4m/2.0}baseURL'],
+            manifest, _F4M_BASE_URL_PATHS,
             'base URL', default=None)
         if base_url:
             base_url = base_url.strip()
 
         bootstrap_info = xpath_element(
-            manifest, ['{http://ns.adobe.com/f4m/1.0}bootstrapInfo', '{http://ns.adobe.com/f4m/2.0}bootstrapInfo'],
+            manifest, _F4M_BOOTSTRAP_INFO_PATHS,
             'bootstrap info', default=None)
 
         vcodec = None
         mime_type = xpath_text(
-            manifest, ['{http://ns.adobe.com/f4m/1.0}mimeType', '{http://ns.adobe.com/f4m/2.0}mimeType'],
+            manifest, _F4M_MIME_TYPE_PATHS,
             'base URL', default=None)
         if mime_type and mime_type.startswith('audio/'):
             vcodec = 'none'
 
         for i, media_el in enumerate(media_nodes):
-            tbr = int_or_none(media_el.attrib.get('bitrate'))
-            width = int_or_none(media_el.attrib.get('width'))
-            height = int_or_none(media_el.attrib.get('height'))
-            format_id = '-'.join(filter(None, [f4m_id, compat_str(i if tbr is None else tbr)]))
+            attrib = media_el.attrib
+            tbr = int_or_none(attrib.get('bitrate'))
+            width = int_or_none(attrib.get('width'))
+            height = int_or_none(attrib.get('height'))
+            # The second part is never empty, so only f4m_id needs checking
+            format_id = compat_str(i if tbr is None else tbr)
+            if f4m_id:
+                format_id = '%s-%s' % (f4m_id, format_id)
             # If <bootstrapInfo> is present, the specified f4m is a
             # stream-level manifest, and only set-level manifests may refer to
             # external resources.  See section 11.4 and section 4 of F4M spec
@@ -1122,9 +1347,9 @@ class InfoExtractor(object):
                 media_url = None
                 # @href is introduced in 2.0, see section 11.6 of F4M spec
                 if manifest_version == '2.0':
-                    media_url = media_el.attrib.get('href')
+                    media_url = attrib.get('href')
                 if media_url is None:
-                    media_url = media_el.attrib.get('url')
+                    media_url = attrib.get('url')
                 if not media_url:
                     continue
                 manifest_url = (
@@ -1174,7 +1399,7 @@ class InfoExtractor(object):
 
     def _m3u8_meta_format(self, m3u8_url, ext=None, preference=None, m3u8_id=None):
         return {
-            'format_id': '-'.join(filter(None, [m3u8_id, 'meta'])),
+            'format_id': '%s-meta' % m3u8_id if m3u8_id else 'meta',
             'url': m3u8_url,
             'ext': ext,
             'protocol': 'm3u8',
@@ -1202,7 +1427,7 @@ class InfoExtractor(object):
 
         format_url = lambda u: (
             u
-            if re.match(r'^https?://', u)
+            if u.startswith(('http://', 'https://'))
             else compat_urlparse.urljoin(m3u8_url, u))
 
         # We should try extracting formats only from master playlists [1], i.e.
@@ -1290,13 +1515,12 @@ class InfoExtractor(object):
                 }
                 resolution = last_info.get('RESOLUTION')
                 if resolution:
-                    mobj = re.search(r'(?P<width>\d+)[xX](?P<height>\d+)', resolution)
+                    mobj = _M3U8_RESOLUTION_RE.search(resolution)
                     if mobj:
                         f['width'] = int(mobj.group('width'))
                         f['height'] = int(mobj.group('height'))
                 # Unified Streaming Platform
-                mobj = re.search(
-                    r'audio.*?(?:%3D|=)(\d+)(?:-video.*?(?:%3D|=)(\d+))?', f['url'])
+                mobj = _USP_BITRATES_RE.search(f['url'])
                 if mobj:
                     abr, vbr = mobj.groups()
                     abr, vbr = float_or_none(abr, 1000), float_or_none(vbr, 1000)
@@ -1317,13 +1541,17 @@ class InfoExtractor(object):
     def _xpath_ns(path, namespace=None):
         if not namespace:
             return path
-        out = []
-        for c in path.split('/'):
-            if not c or c == '.':
-                out.append(c)
-            else:
-                out.append('{%s}%s' % (namespace, c))
-        return '/'.join(out)
+        key = (path, namespace)
+        ns_path = _XPATH_NS_CACHE.get(key)
+        if ns_path is None:
+            out = []
+            for c in path.split('/'):
+                if not c or c == '.':
+                    out.append(c)
+                else:
+                    out.append('{%s}%s' % (namespace, c))
+            ns_path = _XPATH_NS_CACHE[key] = '/'.join(out)
+        return ns_path
 
     def _extract_smil_formats(self, smil_url, video_id, fatal=True, f4m_params=None, transform_source=None):
         smil = self._download_smil(smil_url, video_id, fatal=fatal, transform_source=transform_source)
@@ -1360,8 +1588,8 @@ class InfoExtractor(object):
         description = None
         upload_date = None
         for meta in smil.findall(self._xpath_ns('./head/meta', namespace)):
-            name = meta.attrib.get('name')
-            content = meta.attrib.get('content')
+            name = meta.get('name')
+            content = meta.get('content')
             if not name or not content:
                 continue
             if not title and name == 'title':
@@ -1370,6 +1598,10 @@ class InfoExtractor(object):
                 description = content
             elif not upload_date and name == 'date':
                 upload_date = unified_strdate(content)
+            else:
+                continue
+            if title and description and upload_date:
+                break
 
         thumbnails = [{
             'id': image.get('type'),
@@ -1389,8 +1621,7 @@ class InfoExtractor(object):
         }
 
     def _parse_smil_namespace(self, smil):
-        return self._search_regex(
-            r'(?i)^{([^}]+)?}smil$', smil.tag, 'namespace', default=None)
+        return _xml_tag_namespace(smil.tag, 'smil')
 
     def _parse_smil_formats(self, smil, smil_url, video_id, namespace=None, f4m_params=None, transform_rtmp_url=None):
         base = smil_url
@@ -1405,13 +1636,15 @@ class InfoExtractor(object):
         http_count = 0
         m3u8_count = 0
 
-        srcs = []
-        media = smil.findall(self._xpath_ns('.//video', namespace)) + smil.findall(self._xpath_ns('.//audio', namespace))
+        srcs = set()
+        media = itertools.chain(
+            smil.findall(self._xpath_ns('.//video', namespace)),
+            smil.findall(self._xpath_ns('.//audio', namespace)))
         for medium in media:
             src = medium.get('src')
             if not src or src in srcs:
                 continue
-            srcs.append(src)
+            srcs.add(src)
 
             bitrate = float_or_none(medium.get('system-bitrate') or medium.get('systemBitrate'), 1000)
             filesize = int_or_none(medium.get('size') or medium.get('fileSize'))
@@ -1487,13 +1720,13 @@ class InfoExtractor(object):
         return formats
 
     def _parse_smil_subtitles(self, smil, namespace=None, subtitles_lang='en'):
-        urls = []
+        urls = set()
         subtitles = {}
         for num, textstream in enumerate(smil.findall(self._xpath_ns('.//textstream', namespace))):
             src = textstream.get('src')
             if not src or src in urls:
                 continue
-            urls.append(src)
+            urls.add(src)
             ext = textstream.get('ext') or mimetype2ext(textstream.get('type')) or determine_ext(src)
             lang = textstream.get('systemLanguage') or textstream.get('systemLanguageName') or textstream.get('lang') or subtitles_lang
             subtitles.setdefault(lang, []).append({
@@ -1557,7 +1790,7 @@ class InfoExtractor(object):
         mpd_base_url = base_url(urlh.geturl())
 
         return self._parse_mpd_formats(
-            compat_etree_fromstring(mpd.encode('utf-8')), mpd_id, mpd_base_url,
+            _xml_from_text(mpd), mpd_id, mpd_base_url,
             formats_dict=formats_dict, mpd_url=mpd_url)
 
     def _parse_mpd_formats(self, mpd_doc, mpd_id=None, mpd_base_url='', formats_dict={}, mpd_url=None):
@@ -1571,13 +1804,24 @@ class InfoExtractor(object):
         if mpd_doc.get('type') == 'dynamic':
             return []
 
-        namespace = self._search_regex(r'(?i)^{([^}]+)?}MPD$', mpd_doc.tag, 'namespace', default=None)
+        namespace = _xml_tag_namespace(mpd_doc.tag, 'mpd')
 
         def _add_ns(path):
             return self._xpath_ns(path, namespace)
 
+        # Namespaced tags looked up for every Period, AdaptationSet and
+        # Representation
+        content_protection_tag = _add_ns('ContentProtection')
+        segment_timeline_tag = _add_ns('SegmentTimeline')
+        s_tag = _add_ns('S')
+        initialization_tag = _add_ns('Initialization')
+        segment_list_tag = _add_ns('SegmentList')
+        segment_url_tag = _add_ns('SegmentURL')
+        segment_template_tag = _add_ns('SegmentTemplate')
+        base_url_tag = _add_ns('BaseURL')
+
         def is_drm_protected(element):
-            return element.find(_add_ns('ContentProtection')) is not None
+            return element.find(content_protection_tag) is not None
 
         def extract_multisegment_info(element, ms_parent_info):
             ms_info = ms_parent_info.copy()
@@ -1586,21 +1830,22 @@ class InfoExtractor(object):
             # common attributes and elements.  We will only extract relevant
             # for us.
             def extract_common(source):
-                segment_timeline = source.find(_add_ns('SegmentTimeline'))
+                segment_timeline = source.find(segment_timeline_tag)
                 if segment_timeline is not None:
-                    s_e = segment_timeline.findall(_add_ns('S'))
+                    s_e = segment_timeline.findall(s_tag)
                     if s_e:
                         ms_info['total_number'] = 0
+                        # (t, d, r) tuples of S elements
                         ms_info['s'] = []
                         for s in s_e:
                             r = int(s.get('r', 0))
                             ms_info['total_number'] += 1 + r
-                            ms_info['s'].append({
-                                't': int(s.get('t', 0)),
+                            ms_info['s'].append((
+                                int(s.get('t', 0)),
                                 # @d is mandatory (see [1, 5.3.9.6.2, Table 17, page 60])
-                                'd': int(s.attrib['d']),
-                                'r': r,
-                            })
+                                int(s.attrib['d']),
+                                r,
+                            ))
                 start_number = source.get('startNumber')
                 if start_number:
                     ms_info['start_number'] = int(start_number)
@@ -1612,19 +1857,19 @@ class InfoExtractor(object):
                     ms_info['segment_duration'] = int(segment_duration)
 
             def extract_Initialization(source):
-                initialization = source.find(_add_ns('Initialization'))
+                initialization = source.find(initialization_tag)
                 if initialization is not None:
                     ms_info['initialization_url'] = initialization.attrib['sourceURL']
 
-            segment_list = element.find(_add_ns('SegmentList'))
+            segment_list = element.find(segment_list_tag)
             if segment_list is not None:
                 extract_common(segment_list)
                 extract_Initialization(segment_list)
-                segment_urls_e = segment_list.findall(_add_ns('SegmentURL'))
+                segment_urls_e = segment_list.findall(segment_url_tag)
                 if segment_urls_e:
                     ms_info['segment_urls'] = [segment.attrib['media'] for segment in segment_urls_e]
             else:
-                segment_template = element.find(_add_ns('SegmentTemplate'))
+                segment_template = element.find(segment_template_tag)
                 if segment_template is not None:
                     extract_common(segment_template)
                     media_template = segment_template.get('media')
@@ -1639,6 +1884,9 @@ class InfoExtractor(object):
 
         mpd_duration = parse_duration(mpd_doc.get('mediaPresentationDuration'))
         formats = []
+        # Representations mostly repeat a few mimeType/codecs combinations
+        ext_cache = {}
+        codecs_cache = {}
         for period in mpd_doc.findall(_add_ns('Period')):
             period_duration = parse_duration(period.get('duration')) or mpd_duration
             period_ms_info = extract_multisegment_info(period, {
@@ -1663,24 +1911,32 @@ class InfoExtractor(object):
                     elif content_type == 'video' or content_type == 'audio':
                         base_url = ''
                         for element in (representation, adaptation_set, period, mpd_doc):
-                            base_url_e = element.find(_add_ns('BaseURL'))
+                            base_url_e = element.find(base_url_tag)
                             if base_url_e is not None:
                                 base_url = base_url_e.text + base_url
-                                if re.match(r'^https?://', base_url):
+                                if base_url.startswith(('http://', 'https://')):
                                     break
-                        if mpd_base_url and not re.match(r'^https?://', base_url):
+                        if mpd_base_url and not base_url.startswith(('http://', 'https://')):
                             if not mpd_base_url.endswith('/') and not base_url.startswith('/'):
                                 mpd_base_url += '/'
                             base_url = mpd_base_url + base_url
                         representation_id = representation_attrib.get('id')
                         lang = representation_attrib.get('lang')
-                        url_el = representation.find(_add_ns('BaseURL'))
+                        bandwidth = int_or_none(representation_attrib.get('bandwidth'))
+                        ext = ext_cache.get(mime_type)
+                        if ext is None:
+                            ext = ext_cache[mime_type] = mimetype2ext(mime_type)
+                        codecs = representation_attrib.get('codecs')
+                        codecs_info = codecs_cache.get(codecs)
+                        if codecs_info is None:
+                            codecs_info = codecs_cache[codecs] = parse_codecs(codecs)
+                        url_el = representation.find(base_url_tag)
                         filesize = int_or_none(url_el.attrib.get('{http://youtube.com/yt/2012/10/10}contentLength') if url_el is not None else None)
                         f = {
                             'format_id': '%s-%s' % (mpd_id, representation_id) if mpd_id else representation_id,
                             'url': base_url,
                             'manifest_url': mpd_url,
-                            'ext': mimetype2ext(mime_type),
+                            'ext': ext,
                             'width': int_or_none(representation_attrib.get('width')),
                             'height': int_or_none(representation_attrib.get('height')),
                             'tbr': int_or_none(representation_attrib.get('bandwidth'), 1000),
@@ -1690,15 +1946,12 @@ class InfoExtractor(object):
                             'format_note': 'DASH %s' % content_type,
                             'filesize': filesize,
                         }
-                        f.update(parse_codecs(representation_attrib.get('codecs')))
+                        f.update(codecs_info)
                         representation_ms_info = extract_multisegment_info(representation, adaption_set_ms_info)
                         if 'segment_urls' not in representation_ms_info and 'media_template' in representation_ms_info:
 
-                            media_template = representation_ms_info['media_template']
-                            media_template = media_template.replace('$RepresentationID$', representation_id)
-                            media_template = re.sub(r'\$(Number|Bandwidth|Time)\$', r'%(\1)d', media_template)
-                            media_template = re.sub(r'\$(Number|Bandwidth|Time)%([^$]+)\$', r'%(\1)\2', media_template)
-                            media_template.replace('$$', '$')
+                            media_template = _mpd_template_to_format(
+                                representation_ms_info['media_template'], representation_id)
 
                             # As per [1, 5.3.9.4.4, Table 16, page 55] $Number$ and $Time$
                             # can't be used at the same time
@@ -1710,7 +1963,7 @@ class InfoExtractor(object):
                                 representation_ms_info['fragments'] = [{
                                     'url': media_template % {
                                         'Number': segment_number,
-                                        'Bandwidth': int_or_none(representation_attrib.get('bandwidth')),
+                                        'Bandwidth': bandwidth,
                                     },
                                     'duration': segment_duration,
                                 } for segment_number in range(
@@ -1720,32 +1973,27 @@ class InfoExtractor(object):
                                 # $Number*$ or $Time$ in media template with S list available
                                 # Example $Number*$: http://www.svtplay.se/klipp/9023742/stopptid-om-bjorn-borg
                                 # Example $Time$: https://play.arkena.com/embed/avp/v2/player/media/b41dda37-d8e7-4d3f-b1b5-9a9db578bdfe/1/129411
-                                representation_ms_info['fragments'] = []
+                                fragments = representation_ms_info['fragments'] = []
                                 segment_time = 0
-                                segment_d = None
                                 segment_number = representation_ms_info['start_number']
-
-                                def add_segment_url():
-                                    segment_url = media_template % {
-                                        'Time': segment_time,
-                                        'Bandwidth': int_or_none(representation_attrib.get('bandwidth')),
-                                        'Number': segment_number,
-                                    }
-                                    representation_ms_info['fragments'].append({
-                                        'url': segment_url,
-                                        'duration': float_or_none(segment_d, representation_ms_info['timescale']),
-                                    })
-
-                                for num, s in enumerate(representation_ms_info['s']):
-                                    segment_time = s.get('t') or segment_time
-                                    segment_d = s['d']
-                                    add_segment_url()
-                                    segment_number += 1
-                                    for r in range(s.get('r', 0)):
+                                timescale = representation_ms_info['timescale']
+
+                                for s_t, segment_d, s_r in representation_ms_info['s']:
+                                    segment_time = s_t or segment_time
+                                    fragment_duration = float_or_none(segment_d, timescale)
+                                    # @r counts the repetitions after the first segment;
+                                    # a negative @r still yields the first one
+                                    for r in range(max(s_r, 0) + 1):
+                                        fragments.append({
+                                            'url': media_template % {
+                                                'Time': segment_time,
+                                                'Bandwidth': bandwidth,
+                                                'Number': segment_number,
+                                            },
+                                            'duration': fragment_duration,
+                                        })
                                         segment_time += segment_d
-                                        add_segment_url()
                                         segment_number += 1
-                                    segment_time += segment_d
                         elif 'segment_urls' in representation_ms_info and 's' in representation_ms_info:
                             # No media template
                             # Example: https://www.youtube.com/watch?v=iXZV5uAYMJI
@@ -1753,29 +2001,32 @@ class InfoExtractor(object):
                             fragments = []
                             s_num = 0
                             for segment_url in representation_ms_info['segment_urls']:
-                                s = representation_ms_info['s'][s_num]
-                                for r in range(s.get('r', 0) + 1):
+                                s_t, s_d, s_r = representation_ms_info['s'][s_num]
+                                for r in range(s_r + 1):
                                     fragments.append({
                                         'url': segment_url,
-                                        'duration': float_or_none(s['d'], representation_ms_info['timescale']),
+                                        'duration': float_or_none(s_d, representation_ms_info['timescale']),
                                     })
                             representation_ms_info['fragments'] = fragments
                         # NB: MPD manifest may contain direct URLs to unfragmented media.
                         # No fragments key is present in this case.
                         if 'fragments' in representation_ms_info:
-                            f.update({
-                                'fragments': [],
-                                'protocol': 'http_dash_segments',
-                            })
+                            # The fragment list and dicts were built above for
+                            # this Representation only, so they are reused as is
+                            fragments = representation_ms_info['fragments']
+                            join_fragment_url = _base_urljoin(base_url)
+                            for fragment in fragments:
+                                fragment['url'] = join_fragment_url(fragment['url'])
                             if 'initialization_url' in representation_ms_info:
                                 initialization_url = representation_ms_info['initialization_url'].replace('$RepresentationID$', representation_id)
-                                initialization_url = initialization_url.replace("$Bandwidth$",str(int_or_none(representation_attrib.get('bandwidth'))))
+                                initialization_url = initialization_url.replace("$Bandwidth$",str(bandwidth))
                                 if not f.get('url'):
                                     f['url'] = initialization_url
-                                f['fragments'].append({'url': initialization_url})
-                            f['fragments'].extend(representation_ms_info['fragments'])
-                            for fragment in f['fragments']:
-                                fragment['url'] = urljoin(base_url, fragment['url'])
+                                fragments.insert(0, {'url': join_fragment_url(initialization_url)})
+                            f.update({
+                                'fragments': fragments,
+                                'protocol': 'http_dash_segments',
+                            })
                         try:
                             existing_format = next(
                                 fo for fo in formats
@@ -1801,7 +2052,7 @@ class InfoExtractor(object):
         ism, urlh = res
 
         return self._parse_ism_formats(
-            compat_etree_fromstring(ism.encode('utf-8')), urlh.geturl(), ism_id)
+            _xml_from_text(ism), urlh.geturl(), ism_id)
 
     def _parse_ism_formats(self, ism_doc, ism_url, ism_id=None):
         if ism_doc.get('IsLive') == 'TRUE' or ism_doc.find('Protection') is not None:
@@ -1829,8 +2080,10 @@ class InfoExtractor(object):
                 height = int_or_none(track.get('MaxHeight'))
                 sampling_rate = int_or_none(track.get('SamplingRate'))
 
-                track_url_pattern = re.sub(r'{[Bb]itrate}', track.attrib['Bitrate'], url_pattern)
+                track_url_pattern = _ISM_BITRATE_RE.sub(track.attrib['Bitrate'], url_pattern)
                 track_url_pattern = compat_urlparse.urljoin(ism_url, track_url_pattern)
+                # Split once per track, fragment URLs are then a plain join
+                track_url_parts = _ISM_START_TIME_RE.split(track_url_pattern)
 
                 fragments = []
                 fragment_ctx = {
@@ -1847,10 +2100,11 @@ class InfoExtractor(object):
                         except IndexError:
                             next_fragment_time = duration
                         fragment_ctx['duration'] = (next_fragment_time - fragment_ctx['time']) / fragment_repeat
+                    fragment_duration = fragment_ctx['duration'] / stream_timescale
                     for _ in range(fragment_repeat):
                         fragments.append({
-                            'url': re.sub(r'{start[ _]time}', compat_str(fragment_ctx['time']), track_url_pattern),
-                            'duration': fragment_ctx['duration'] / stream_timescale,
+                            'url': compat_str(fragment_ctx['time']).join(track_url_parts),
+                            'duration': fragment_duration,
                         })
                         fragment_ctx['time'] += fragment_ctx['duration']
 
@@ -1896,7 +2150,7 @@ class InfoExtractor(object):
         def parse_content_type(content_type):
             if not content_type:
                 return {}
-            ctr = re.search(r'(?P<mimetype>[^/]+/[^;]+)(?:;\s*codecs="?(?P<codecs>[^"]+))?', content_type)
+            ctr = _HTML5_CONTENT_TYPE_RE.search(content_type)
             if ctr:
                 mimetype, codecs = ctr.groups()
                 f = parse_codecs(codecs)
@@ -1927,8 +2181,8 @@ class InfoExtractor(object):
         entries = []
         media_tags = [(media_tag, media_type, '')
                       for media_tag, media_type
-                      in re.findall(r'(?s)(<(video|audio)[^>]*/>)', webpage)]
-        media_tags.extend(re.findall(r'(?s)(<(?P<tag>video|audio)[^>]*>)(.*?)</(?P=tag)>', webpage))
+                      in _HTML5_SELF_CLOSING_MEDIA_RE.findall(webpage)]
+        media_tags.extend(_HTML5_MEDIA_RE.findall(webpage))
         for media_tag, media_type, media_content in media_tags:
             media_info = {
                 'formats': [],
@@ -1941,7 +2195,7 @@ class InfoExtractor(object):
                 media_info['formats'].extend(formats)
             media_info['thumbnail'] = media_attributes.get('poster')
             if media_content:
-                for source_tag in re.findall(r'<source[^>]+>', media_content):
+                for source_tag in _HTML5_SOURCE_RE.findall(media_content):
                     source_attributes = extract_attributes(source_tag)
                     src = source_attributes.get('src')
                     if not src:
@@ -1949,11 +2203,14 @@ class InfoExtractor(object):
                     is_plain_url, formats = _media_formats(src, media_type)
                     if is_plain_url:
                         f = parse_content_type(source_attributes.get('type'))
-                        f.update(formats[0])
+                        if f:
+                            f.update(formats[0])
+                        else:
+                            f = formats[0]
                         media_info['formats'].append(f)
                     else:
                         media_info['formats'].extend(formats)
-                for track_tag in re.findall(r'<track[^>]+>', media_content):
+                for track_tag in _HTML5_TRACK_RE.findall(media_content):
                     track_attributes = extract_attributes(track_tag)
                     kind = track_attributes.get('kind')
                     if not kind or kind in ('subtitles', 'captions'):
@@ -1971,10 +2228,10 @@ class InfoExtractor(object):
     def _extract_akamai_formats(self, manifest_url, video_id, hosts={}):
         formats = []
         hdcore_sign = 'hdcore=3.7.0'
-        f4m_url = re.sub(r'(https?://[^/+])/i/', r'\1/z/', manifest_url).replace('/master.m3u8', '/manifest.f4m')
+        f4m_url = _AKAMAI_I_Z_RE.sub(r'\1/z/', manifest_url).replace('/master.m3u8', '/manifest.f4m')
         hds_host = hosts.get('hds')
         if hds_host:
-            f4m_url = re.sub(r'(https?://)[^/]+', r'\1' + hds_host, f4m_url)
+            f4m_url = _AKAMAI_HOST_RE.sub(r'\1' + hds_host, f4m_url)
         if 'hdcore=' not in f4m_url:
             f4m_url += ('&' if '?' in f4m_url else '?') + hdcore_sign
         f4m_formats = self._extract_f4m_formats(
@@ -1982,18 +2239,18 @@ class InfoExtractor(object):
         for entry in f4m_formats:
             entry.update({'extra_param_to_segment_url': hdcore_sign})
         formats.extend(f4m_formats)
-        m3u8_url = re.sub(r'(https?://[^/]+)/z/', r'\1/i/', manifest_url).replace('/manifest.f4m', '/master.m3u8')
+        m3u8_url = _AKAMAI_Z_I_RE.sub(r'\1/i/', manifest_url).replace('/manifest.f4m', '/master.m3u8')
         hls_host = hosts.get('hls')
         if hls_host:
-            m3u8_url = re.sub(r'(https?://)[^/]+', r'\1' + hls_host, m3u8_url)
+            m3u8_url = _AKAMAI_HOST_RE.sub(r'\1' + hls_host, m3u8_url)
         formats.extend(self._extract_m3u8_formats(
             m3u8_url, video_id, 'mp4', 'm3u8_native',
             m3u8_id='hls', fatal=False))
         return formats
 
     def _extract_wowza_formats(self, url, video_id, m3u8_entry_protocol='m3u8_native', skip_protocols=[]):
-        url = re.sub(r'/(?:manifest|playlist|jwplayer)\.(?:m3u8|f4m|mpd|smil)', '', url)
-        url_base = self._search_regex(r'(?:https?|rtmp|rtsp)(://[^?]+)', url, 'format url')
+        url = _WOWZA_MANIFEST_RE.sub('', url)
+        url_base = self._search_regex(_WOWZA_BASE_RE, url, 'format url')
         http_base_url = 'http' + url_base
         formats = []
         if 'm3u8' not in skip_protocols:
@@ -2008,7 +2265,7 @@ class InfoExtractor(object):
             formats.extend(self._extract_mpd_formats(
                 http_base_url + '/manifest.mpd',
                 video_id, mpd_id='dash', fatal=False))
-        if re.search(r'(?:/smil:|\.smil)', url_base):
+        if _WOWZA_SMIL_RE.search(url_base):
             if 'smil' not in skip_protocols:
                 rtmp_formats = self._extract_smil_formats(
                     http_base_url + '/jwplayer.smil',
@@ -2023,7 +2280,8 @@ class InfoExtractor(object):
                         'format_id': rtmp_format['format_id'].replace('rtmp', 'rtsp'),
                         'protocol': 'rtsp',
                     })
-                    formats.extend([rtmp_format, rtsp_format])
+                    formats.append(rtmp_format)
+                    formats.append(rtsp_format)
         else:
             for protocol in ('rtmp', 'rtsp'):
                 if protocol not in skip_protocols:
@@ -2036,14 +2294,10 @@ class InfoExtractor(object):
 
     def _live_title(self, name):
         """ Generate the title for a live video """
-        now = datetime.datetime.now()
-        now_str = now.strftime('%Y-%m-%d %H:%M')
-        return name + ' ' + now_str
+        return '%s %s' % (name, datetime.datetime.now().strftime('%Y-%m-%d %H:%M'))
 
     def _int(self, v, name, fatal=False, **kwargs):
         res = int_or_none(v, **kwargs)
-        if 'get_attr' in kwargs:
-            print(getattr(v, kwargs['get_attr']))
         if res is None:
             msg = 'Failed to extract %s: Could not parse value %r' % (name, v)
             if fatal:
@@ -2074,18 +2328,21 @@ class InfoExtractor(object):
         self._downloader.cookiejar.add_cookie_header(req)
         return compat_cookies.SimpleCookie(req.get_header('Cookie'))
 
-    def get_testcases(self, include_onlymatching=False):
+    def _get_tests(self):
         t = getattr(self, '_TEST', None)
         if t:
             assert not hasattr(self, '_TESTS'), \
                 '%s has _TEST and _TESTS' % type(self).__name__
-            tests = [t]
-        else:
-            tests = getattr(self, '_TESTS', [])
+            return [t]
+        return getattr(self, '_TESTS', [])
+
+    def get_testcases(self, include_onlymatching=False):
+        tests = self._get_tests()
+        name = type(self).__name__[:-len('IE')]
         for t in tests:
             if not include_onlymatching and t.get('only_matching', False):
                 continue
-            t['name'] = type(self).__name__[:-len('IE')]
+            t['name'] = name
             yield t
 
     def is_suitable(self, age_limit):
@@ -2093,9 +2350,12 @@ class InfoExtractor(object):
         age limit (i.e. pornographic sites are not, all others usually are) """
 
         any_restricted = False
-        for tc in self.get_testcases(include_onlymatching=False):
-            if tc.get('playlist', []):
-                tc = tc['playlist'][0]
+        for tc in self._get_tests():
+            if tc.get('only_matching', False):
+                continue
+            playlist = tc.get('playlist')
+            if playlist:
+                tc = playlist[0]
             is_restricted = age_restricted(
                 tc.get('info_dict', {}).get('age_limit'), age_limit)
             if not is_restricted:
@@ -2104,8 +2364,8 @@ class InfoExtractor(object):
         return not any_restricted
 
     def extract_subtitles(self, *args, **kwargs):
-        if (self._downloader.params.get('writesubtitles', False) or
-                self._downloader.params.get('listsubtitles')):
+        params = self._downloader.params
+        if params.get('writesubtitles', False) or params.get('listsubtitles'):
             return self._get_subtitles(*args, **kwargs)
         return {}
 
@@ -2116,7 +2376,7 @@ class InfoExtractor(object):
     def _merge_subtitle_items(subtitle_list1, subtitle_list2):
         """ Merge subtitle items for one language. Items with duplicated URLs
         will be dropped. """
-        list1_urls = set([item['url'] for item in subtitle_list1])
+        list1_urls = set(item['url'] for item in subtitle_list1)
         ret = list(subtitle_list1)
         ret.extend([item for item in subtitle_list2 if item['url'] not in list1_urls])
         return ret
@@ -2125,13 +2385,16 @@ class InfoExtractor(object):
     def _merge_subtitles(cls, subtitle_dict1, subtitle_dict2):
         """ Merge two subtitle dictionaries, language by language. """
         ret = dict(subtitle_dict1)
-        for lang in subtitle_dict2:
-            ret[lang] = cls._merge_subtitle_items(subtitle_dict1.get(lang, []), subtitle_dict2[lang])
+        for lang, subtitle_list2 in subtitle_dict2.items():
+            if lang in subtitle_dict1:
+                ret[lang] = cls._merge_subtitle_items(subtitle_dict1[lang], subtitle_list2)
+            else:
+                ret[lang] = list(subtitle_list2)
         return ret
 
     def extract_automatic_captions(self, *args, **kwargs):
-        if (self._downloader.params.get('writeautomaticsub', False) or
-                self._downloader.params.get('listsubtitles')):
+        params = self._downloader.params
+        if params.get('writeautomaticsub', False) or params.get('listsubtitles'):
             return self._get_automatic_captions(*args, **kwargs)
         return {}
 
@@ -2139,9 +2402,10 @@ class InfoExtractor(object):
         raise NotImplementedError('This method must be implemented by subclasses')
 
     def mark_watched(self, *args, **kwargs):
-        if (self._downloader.params.get('mark_watched', False) and
+        params = self._downloader.params
+        if (params.get('mark_watched', False) and
                 (self._get_login_info()[0] is not None or
-                    self._downloader.params.get('cookiefile') is not None)):
+                    params.get('cookiefile') is not None)):
             self._mark_watched(*args, **kwargs)
 
     def _mark_watched(self, *args, **kwargs):
@@ -2174,10 +2438,17 @@ class SearchInfoExtractor(InfoExtractor):
 
     @classmethod
     def suitable(cls, url):
-        return re.match(cls._make_valid_url(), url) is not None
+        valid_url_re = cls.__dict__.get('_SEARCH_VALID_URL_RE')
+        if valid_url_re is None:
+            valid_url_re = cls._SEARCH_VALID_URL_RE = re.compile(cls._make_valid_url())
+        return valid_url_re.match(url) is not None
 
     def _real_extract(self, query):
-        mobj = re.match(self._make_valid_url(), query)
+        cls = self.__class__
+        valid_url_re = cls.__dict__.get('_SEARCH_VALID_URL_RE')
+        if valid_url_re is None:
+            valid_url_re = cls._SEARCH_VALID_URL_RE = re.compile(cls._make_valid_url())
+        mobj = valid_url_re.match(query)
         if mobj is None:
             raise ExtractorError('Invalid search query "%s"' % query)
 
@@ -377,6 +377,17 @@ class HTMLAttributeParser(compat_HTMLParser):
         self.attrs = dict(attrs)
 
 
+# Start tags that HTMLAttributeParser would parse the same way without
+# any entity decoding: ASCII names, plain separators and no '&' in values
+_SIMPLE_START_TAG_RE = re.compile(r'''(?x)
+    <[a-zA-Z][-a-zA-Z0-9]*
+    ((?:[ \t\n\r\f]+[a-zA-Z_:][-a-zA-Z0-9_:.]*
+        (?:[ \t\n\r\f]*=[ \t\n\r\f]*(?:"[^"&<]*"|'[^'&<]*'|[^\s"'=<>`&]+))?)*)
+    [ \t\n\r\f]*/?>\Z''')
+_SIMPLE_ATTRIBUTE_RE = re.compile(
+    r'''([a-zA-Z_:][-a-zA-Z0-9_:.]*)(?:[ \t\n\r\f]*=[ \t\n\r\f]*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`&]+)))?''')
+
+
 def extract_attributes(html_element):
     """Given a string for an HTML element such as
     <el
@@ -393,6 +404,12 @@ def extract_attributes(html_element):
     NB HTMLParser is stricter in Python 2.6 & 3.2 than in later versions,
     but the cases in the unit test will work for all of 2.6, 2.7, 3.2-3.5.
     """
+    mobj = _SIMPLE_START_TAG_RE.match(html_element)
+    if mobj:
+        attrs = {}
+        for attr in _SIMPLE_ATTRIBUTE_RE.finditer(mobj.group(1)):
+            attrs[attr.group(1).lower()] = attr.group(attr.lastindex) if attr.lastindex > 1 else None
+        return attrs
     parser = HTMLAttributeParser()
     parser.feed(html_element)
     parser.close()
@@ -565,13 +582,19 @@ def _htmlentity_transform(entity_with_semicolon):
     return '&%s;' % entity
 
 
+_HTML_ENTITY_RE = re.compile(r'&([^;]+;)')
+
+
 def unescapeHTML(s):
     if s is None:
         return None
     assert type(s) == compat_str
 
-    return re.sub(
-        r'&([^;]+;)', lambda m: _htmlentity_transform(m.group(1)), s)
+    # Most strings contain no entities at all
+    if '&' not in s:
+        return s
+
+    return _HTML_ENTITY_RE.sub(lambda m: _htmlentity_transform(m.group(1)), s)
 
 
 def get_subprocess_encoding():
@@ -3072,9 +3095,12 @@ def decode_packed_codes(code):
         obfucasted_code)
 
 
+_M3U8_ATTRIBUTE_RE = re.compile(r'(?P<key>[A-Z0-9-]+)=(?P<val>"[^"]+"|[^",]+)(?:,|$)')
+
+
 def parse_m3u8_attributes(attrib):
     info = {}
-    for (key, val) in re.findall(r'(?P<key>[A-Z0-9-]+)=(?P<val>"[^"]+"|[^",]+)(?:,|$)', attrib):
+    for (key, val) in _M3U8_ATTRIBUTE_RE.findall(attrib):
         if val.startswith('"'):
             val = val[1:-1]
         info[key] = val